@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import logging
+from contextlib import asynccontextmanager
 from typing import Optional
 
 from fastapi import FastAPI, HTTPException
@@ -17,7 +18,14 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(me
 settings = get_settings()
 pipeline = RAGPipeline(settings)
 
-app = FastAPI(title="FalconGraph Web RAG API", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    yield
+    await pipeline.aclose()
+
+
+app = FastAPI(title="FalconGraph Web RAG API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,11 +19,21 @@ class Settings(BaseModel):
     tavily_api_key: str | None = Field(default=None, repr=False)
 
     max_web_results: int = 10
+    search_cache_size: int = 4096
+    search_cache_ttl: float = 900.0
     top_k_chunks: int = 6
     chunk_chars: int = 1200
     chunk_overlap: int = 200
     min_chunk_chars: int = 280
     request_timeout: float = 15.0
+    max_requests_per_host: int = 8
+    max_page_bytes: int = 256 * 1024
+
+    embedding_cache_dir: str | None = "data/cache/embeddings"
+    embedding_cache_size_mb: int = 500
+    embedding_cache_memory_items: int = 4096
+    page_cache_dir: str | None = "data/cache/pages"
+    page_cache_size_mb: int = 500
 
     user_agent: str = "FalconGraphSearchBot/0.1 (+https://www.bgsu.edu)"
 
@@ -41,4 +51,6 @@ def get_settings() -> Settings:
         search_provider=os.getenv("SEARCH_PROVIDER", "bing").lower(),
         bing_api_key=os.getenv("BING_API_KEY"),
         tavily_api_key=os.getenv("TAVILY_API_KEY"),
+        embedding_cache_dir=os.getenv("EMBEDDING_CACHE_DIR", "data/cache/embeddings") or None,
+        page_cache_dir=os.getenv("PAGE_CACHE_DIR", "data/cache/pages") or None,
     )
@@ -1,24 +1,41 @@
 from __future__ import annotations
 
 import asyncio
+from collections import OrderedDict
+import hashlib
 import logging
 from dataclasses import dataclass
 import re
 import time
-from typing import Any, Dict, List, Sequence
-from urllib.parse import urlparse
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.parse import urlsplit
 
+import diskcache
 import faiss
 import httpx
 import numpy as np
-from bs4 import BeautifulSoup
+import orjson
+from cachetools import TTLCache
 from openai import AsyncOpenAI
+from selectolax.lexbor import LexborHTMLParser
 
 from .config import Settings
 
 
 logger = logging.getLogger(__name__)
 
+# OpenAI embeddings accept up to 2048 inputs per request; stay well under the
+# per-request token ceiling using a rough 4-chars-per-token estimate.
+EMBED_MAX_INPUTS = 2048
+EMBED_MAX_TOKENS = 250_000
+FAISS_MIN_CHUNKS = 10_000
+
+_WHITESPACE = re.compile(r"\s+")
+_SPACED_LETTERS = re.compile(r"\b([A-Za-z])\s+([A-Za-z])\b")
+_SPACE_BEFORE_APOSTROPHE = re.compile(r"\s+'")
+_MULTI_SPACE = re.compile(r"[ \t]+")
+_MULTI_NEWLINE = re.compile(r"\n{3,}")
+
 
 @dataclass
 class WebResult:
@@ -27,6 +44,15 @@ class WebResult:
     snippet: str
 
 
+@dataclass
+class FetchedPage:
+    url: str
+    html: Optional[str] = None
+    not_modified: bool = False
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
 @dataclass
 class DocumentChunk:
     id: int
@@ -37,16 +63,100 @@ class DocumentChunk:
 
     @property
     def domain(self) -> str:
-        return urlparse(self.url).netloc
+        return urlsplit(self.url).netloc
 
 
-class WebSearchClient:
+class EmbeddingCache:
+    """Embedding vectors keyed by sha256(model + NUL + text).
+
+    Hot keys live in an in-process LRU; everything is persisted to a size-capped
+    diskcache so repeated chunks survive restarts.
+    """
+
     def __init__(self, settings: Settings):
+        self.model = settings.embedding_model
+        self.memory_items = settings.embedding_cache_memory_items
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._disk = (
+            diskcache.Cache(settings.embedding_cache_dir, size_limit=settings.embedding_cache_size_mb * 1024 * 1024)
+            if settings.embedding_cache_dir
+            else None
+        )
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{text}".encode("utf-8")).hexdigest()
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[np.ndarray]]:
+        vectors: List[Optional[np.ndarray]] = []
+        for key in keys:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+            vectors.append(vector)
+        missing = [idx for idx, vector in enumerate(vectors) if vector is None]
+        if self._disk is None or not missing:
+            return vectors
+        # SQLite reads happen on a worker thread so they never stall the event loop
+        raws = await asyncio.to_thread(self._disk_get_many, [keys[idx] for idx in missing])
+        for idx, raw in zip(missing, raws):
+            if raw is not None:
+                vector = np.frombuffer(raw, dtype=np.float32)
+                self._remember(keys[idx], vector)
+                vectors[idx] = vector
+        return vectors
+
+    async def set_many(self, items: Sequence[tuple[str, np.ndarray]]) -> None:
+        for key, vector in items:
+            self._remember(key, vector)
+        if self._disk is not None and items:
+            await asyncio.to_thread(self._disk_set_many, [(key, vector.tobytes()) for key, vector in items])
+
+    def _disk_get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        assert self._disk is not None
+        with self._disk.transact():
+            return [self._disk.get(key) for key in keys]
+
+    def _disk_set_many(self, items: Sequence[tuple[str, bytes]]) -> None:
+        assert self._disk is not None
+        # one transaction (one commit) for the whole batch instead of one per vector
+        with self._disk.transact():
+            for key, raw in items:
+                self._disk.set(key, raw)
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+
+class WebSearchClient:
+    def __init__(self, settings: Settings, client: httpx.AsyncClient):
         self.settings = settings
+        self.client = client
+        self._cache: TTLCache = TTLCache(maxsize=settings.search_cache_size, ttl=settings.search_cache_ttl)
+        self._locks: Dict[tuple, asyncio.Lock] = {}
 
     async def search(self, query: str, limit: int | None = None) -> List[WebResult]:
         limit = limit or self.settings.max_web_results
         provider = self.settings.search_provider
+        key = (provider, " ".join(query.lower().split()), limit)
+        results = self._cache.get(key)
+        if results is not None:
+            return list(results)
+        # concurrent identical queries wait for the first provider call instead of stampeding
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                results = self._cache.get(key)
+                if results is None:
+                    results = await self._search_provider(provider, query, limit)
+                    self._cache[key] = results
+        finally:
+            self._locks.pop(key, None)
+        return list(results)
+
+    async def _search_provider(self, provider: str, query: str, limit: int) -> List[WebResult]:
         if provider == "bing":
             return await self._search_bing(query, limit)
         if provider == "tavily":
@@ -59,10 +169,9 @@ class WebSearchClient:
         url = "https://api.bing.microsoft.com/v7.0/search"
         params = {"q": query, "count": limit}
         headers = {"Ocp-Apim-Subscription-Key": self.settings.bing_api_key}
-        async with httpx.AsyncClient(timeout=self.settings.request_timeout) as client:
-            resp = await client.get(url, params=params, headers=headers)
-            resp.raise_for_status()
-            data = resp.json()
+        resp = await self.client.get(url, params=params, headers=headers)
+        resp.raise_for_status()
+        data = orjson.loads(resp.content)
         values = data.get("webPages", {}).get("value", [])
         results = []
         for entry in values[:limit]:
@@ -87,10 +196,9 @@ class WebSearchClient:
             "include_answer": False,
         }
         headers = {"Content-Type": "application/json"}
-        async with httpx.AsyncClient(timeout=self.settings.request_timeout) as client:
-            resp = await client.post(url, json=payload, headers=headers)
-            resp.raise_for_status()
-            data = resp.json()
+        resp = await self.client.post(url, content=orjson.dumps(payload), headers=headers)
+        resp.raise_for_status()
+        data = orjson.loads(resp.content)
         results = []
         for entry in data.get("results", [])[:limit]:
             results.append(
@@ -104,17 +212,19 @@ class WebSearchClient:
 
 
 class WebScraper:
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, client: httpx.AsyncClient):
         self.settings = settings
+        self.client = client
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._page_cache = (
+            diskcache.Cache(settings.page_cache_dir, size_limit=settings.page_cache_size_mb * 1024 * 1024)
+            if settings.page_cache_dir
+            else None
+        )
 
     async def fetch_bulk(self, results: Sequence[WebResult]) -> List[Dict[str, str]]:
-        async with httpx.AsyncClient(
-            timeout=self.settings.request_timeout,
-            headers={"User-Agent": self.settings.user_agent},
-            follow_redirects=True,
-        ) as client:
-            tasks = [self._fetch_single(client, result) for result in results]
-            pages = await asyncio.gather(*tasks, return_exceptions=True)
+        tasks = [self._fetch_single(result) for result in results]
+        pages = await asyncio.gather(*tasks, return_exceptions=True)
         documents: List[Dict[str, str]] = []
         for page in pages:
             if isinstance(page, Exception):
@@ -124,69 +234,150 @@ class WebScraper:
                 documents.append(page)
         return documents
 
-    async def _fetch_single(self, client: httpx.AsyncClient, result: WebResult) -> Dict[str, str]:
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(self.settings.max_requests_per_host)
+        return limit
+
+    async def _fetch_single(self, result: WebResult) -> Dict[str, str]:
         if not result.url:
             return {"url": "", "title": result.title, "text": ""}
+        # diskcache is synchronous SQLite, so it runs on a worker thread like EmbeddingCache
+        cached = await asyncio.to_thread(self._page_cache.get, result.url) if self._page_cache is not None else None
         try:
-            resp = await client.get(result.url)
-            resp.raise_for_status()
+            async with self._host_limit(result.url):
+                page = await self._download(result.url, cached)
         except Exception as exc:
             logger.debug("Failed to fetch %s: %s", result.url, exc)
             return {"url": result.url, "title": result.title, "text": ""}
-        text = self._extract_text(resp.text)
+        if page.not_modified and cached:
+            return {"url": cached["url"], "title": result.title or cached["title"], "text": cached["text"]}
+        if page.html is None:
+            return {"url": page.url, "title": result.title, "text": ""}
+        title, text = self._extract_page(page.html)
         trimmed = text[: 12000]  # keep payload manageable per page
-        return {"url": str(resp.url), "title": result.title or self._fallback_title(resp.text), "text": trimmed}
+        if self._page_cache is not None and (page.etag or page.last_modified):
+            await asyncio.to_thread(
+                self._page_cache.set,
+                result.url,
+                {
+                    "url": page.url,
+                    "title": title,
+                    "text": trimmed,
+                    "etag": page.etag,
+                    "last_modified": page.last_modified,
+                },
+            )
+        return {"url": page.url, "title": result.title or title, "text": trimmed}
+
+    async def _download(self, url: str, cached: Optional[Dict[str, str]] = None) -> FetchedPage:
+        """Stream the page body, stopping at max_page_bytes.
+
+        The 12k-char text cap never needs more markup than that, so the rest of a
+        large page is never downloaded. Non-HTML responses are skipped unread, and
+        a cached copy turns the request into a conditional GET.
+        """
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+        limit = self.settings.max_page_bytes
+        async with self.client.stream("GET", url, headers=headers) as resp:
+            if resp.status_code == 304:
+                return FetchedPage(url=str(resp.url), not_modified=True)
+            resp.raise_for_status()
+            page = FetchedPage(
+                url=str(resp.url),
+                etag=resp.headers.get("etag"),
+                last_modified=resp.headers.get("last-modified"),
+            )
+            content_type = resp.headers.get("content-type", "").lower()
+            if content_type and "html" not in content_type:
+                logger.debug("Skipping non-HTML response from %s (%s)", url, content_type)
+                return page
+            body = bytearray()
+            async for chunk in resp.aiter_bytes():
+                body.extend(chunk)
+                if len(body) >= limit:
+                    break
+            page.html = body[:limit].decode(resp.encoding or "utf-8", errors="replace")
+            return page
 
     @staticmethod
-    def _extract_text(html: str) -> str:
-        soup = BeautifulSoup(html, "html.parser")
-        for tag in soup(["script", "style", "noscript", "svg"]):
-            tag.decompose()
-        text = soup.get_text(separator=" ", strip=True)
-        return " ".join(text.split())
+    def _extract_page(html: str) -> tuple[str, str]:
+        """Parse the page once and return (title, clean text)."""
+        tree = LexborHTMLParser(html)
+        title_node = tree.css_first("title")
+        title = title_node.text(strip=True) if title_node is not None else ""
+        for node in tree.css("script, style, noscript, svg"):
+            node.decompose()
+        text = tree.root.text(separator=" ", strip=True) if tree.root else ""
+        return title or "Untitled page", _WHITESPACE.sub(" ", text).strip()
 
-    @staticmethod
-    def _fallback_title(html: str) -> str:
-        soup = BeautifulSoup(html, "html.parser")
-        if soup.title and soup.title.string:
-            return soup.title.string.strip()
-        return "Untitled page"
 
+def _cancel_quietly(task: asyncio.Task) -> None:
+    """Cancel a task whose result is no longer needed, without "exception never retrieved" noise."""
+    task.cancel()
+    task.add_done_callback(lambda done: done.cancelled() or done.exception())
 
-def chunk_text(text: str, chunk_size: int, overlap: int) -> List[str]:
+
+def chunk_text(text: str, chunk_size: int, overlap: int, min_chars: int = 1) -> List[str]:
     cleaned = text.strip()
     if not cleaned:
         return []
     overlap = min(overlap, chunk_size - 1) if chunk_size > 1 else 0
-    chunks = []
-    start = 0
-    while start < len(cleaned):
-        end = min(len(cleaned), start + chunk_size)
-        chunk = cleaned[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
-        if end == len(cleaned):
-            break
-        start = end - overlap
-    return chunks
+    stride = max(chunk_size - overlap, 1)
+    min_chars = max(min_chars, 1)
+    # windows start every `stride` chars; the last one is the first that reaches the end of the text
+    starts = range(0, max(len(cleaned) - overlap, 1), stride)
+    return [
+        chunk
+        for chunk in (cleaned[start : start + chunk_size].strip() for start in starts)
+        if len(chunk) >= min_chars
+    ]
 
 
 class RAGPipeline:
     def __init__(self, settings: Settings):
         self.settings = settings
-        self.search_client = WebSearchClient(settings)
-        self.scraper = WebScraper(settings)
+        # One pooled client for search APIs and page fetches keeps TLS connections warm across requests.
+        self.http = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+            timeout=self.settings.request_timeout,
+            headers={"User-Agent": self.settings.user_agent},
+            follow_redirects=True,
+        )
+        self.search_client = WebSearchClient(settings, self.http)
+        self.scraper = WebScraper(settings, self.http)
+        self.embedding_cache = EmbeddingCache(settings)
         if not self.settings.openai_api_key:
             logger.warning("OPENAI_API_KEY is not configured. RAG responses will fail until set.")
         self.openai = AsyncOpenAI(api_key=self.settings.openai_api_key) if self.settings.openai_api_key else None
 
+    async def aclose(self) -> None:
+        await self.http.aclose()
+
     async def run(self, question: str, limit: int | None = None) -> Dict[str, Any]:
         start_time = time.perf_counter()
         limit = limit or self.settings.max_web_results
         search_results = await self.search_client.search(question, limit)
-        pages = await self.scraper.fetch_bulk(search_results)
+        # The question embedding does not depend on the scraped pages, so overlap it with the
+        # fetches; it is only awaited once there are chunks to rank, so an embedding failure
+        # cannot turn the "nothing found" answer into an error.
+        question_task = asyncio.create_task(self._embed([question]))
+        try:
+            pages = await self.scraper.fetch_bulk(search_results)
+        except BaseException:
+            _cancel_quietly(question_task)
+            raise
         chunks = self._build_chunks(pages)
         if not chunks:
+            _cancel_quietly(question_task)
             return {
                 "answer": "I could not retrieve enough information to answer that question.",
                 "citations": [],
@@ -199,7 +390,8 @@ class RAGPipeline:
                     "web_hits": len(search_results),
                 },
             }
-        scores, ranked_chunks = await self._rank_chunks(question, chunks)
+        question_vectors = await question_task
+        scores, ranked_chunks = await self._rank_chunks(question_vectors[0], chunks)
         response_text = await self._summarize(question, ranked_chunks)
         citations = [
             {
@@ -232,10 +424,13 @@ class RAGPipeline:
         chunks: List[DocumentChunk] = []
         chunk_id = 1
         for doc in documents:
-            text_chunks = chunk_text(doc["text"], self.settings.chunk_chars, self.settings.chunk_overlap)
+            text_chunks = chunk_text(
+                doc["text"],
+                self.settings.chunk_chars,
+                self.settings.chunk_overlap,
+                min_chars=self.settings.min_chunk_chars,
+            )
             for chunk in text_chunks:
-                if len(chunk) < self.settings.min_chunk_chars:
-                    continue
                 chunks.append(
                     DocumentChunk(
                         id=chunk_id,
@@ -247,40 +442,96 @@ class RAGPipeline:
                 chunk_id += 1
         return chunks
 
-    async def _rank_chunks(self, question: str, chunks: List[DocumentChunk]) -> tuple[List[float], List[DocumentChunk]]:
+    async def _rank_chunks(
+        self, question_vector: np.ndarray, chunks: List[DocumentChunk]
+    ) -> tuple[List[float], List[DocumentChunk]]:
         if not self.openai:
             raise RuntimeError("OPENAI_API_KEY not configured.")
         texts = [chunk.text for chunk in chunks]
         vectors = await self._embed(texts)
-        index, matrix = self._build_index(vectors)
-        question_vec = await self._embed([question])
-        query = np.array(question_vec, dtype="float32")
+        matrix = np.array(vectors, dtype="float32")
+        faiss.normalize_L2(matrix)
+        query = np.array([question_vector], dtype="float32")
         faiss.normalize_L2(query)
-        scores, indices = index.search(query, min(self.settings.top_k_chunks, len(chunks)))
-        flat_scores = scores.flatten().tolist()
-        ranked = [chunks[i] for i in indices.flatten()]
+        scores, indices = self._search(matrix, query, min(self.settings.top_k_chunks, len(chunks)))
+        flat_scores = scores.tolist()
+        ranked = [chunks[i] for i in indices.tolist()]
         normalized_scores = [self._normalize_score(score) for score in flat_scores]
         for chunk, score in zip(ranked, normalized_scores):
             chunk.score = score
         return normalized_scores, ranked
 
-    async def _embed(self, texts: Sequence[str]) -> List[List[float]]:
+    async def _embed(self, texts: Sequence[str]) -> List[np.ndarray]:
+        if not self.openai:
+            raise RuntimeError("OPENAI_API_KEY not configured.")
+        keys = [self.embedding_cache.key(text) for text in texts]
+        vectors = await self.embedding_cache.get_many(keys)
+        # repeated texts are sent (and billed) once; every copy shares the result
+        miss_positions: Dict[str, List[int]] = {}
+        for idx, vector in enumerate(vectors):
+            if vector is None:
+                miss_positions.setdefault(keys[idx], []).append(idx)
+        misses = [positions[0] for positions in miss_positions.values()]
+        batches = self._pack_batches(texts, misses)
+        results = await asyncio.gather(*(self._embed_batch([texts[idx] for idx in batch]) for batch in batches))
+        fresh: List[tuple[str, np.ndarray]] = []
+        for batch, batch_vectors in zip(batches, results):
+            for idx, vector in zip(batch, batch_vectors):
+                fresh.append((keys[idx], vector))
+                for position in miss_positions[keys[idx]]:
+                    vectors[position] = vector
+        await self.embedding_cache.set_many(fresh)
+        if misses:
+            logger.debug(
+                "Embedding cache: %s hits, %s misses (%s unique) in %s requests",
+                len(texts) - sum(len(positions) for positions in miss_positions.values()),
+                sum(len(positions) for positions in miss_positions.values()),
+                len(misses),
+                len(batches),
+            )
+        return vectors  # type: ignore[return-value]
+
+    async def _embed_batch(self, inputs: List[str]) -> List[np.ndarray]:
         assert self.openai, "OPENAI_API_KEY not configured."
-        vectors: List[List[float]] = []
-        batch_size = 16
-        for start in range(0, len(texts), batch_size):
-            batch = texts[start : start + batch_size]
-            resp = await self.openai.embeddings.create(model=self.settings.embedding_model, input=batch)
-            vectors.extend([item.embedding for item in resp.data])
-        return vectors
+        resp = await self.openai.embeddings.create(model=self.settings.embedding_model, input=inputs)
+        return [np.asarray(item.embedding, dtype=np.float32) for item in resp.data]
 
     @staticmethod
-    def _build_index(vectors: Sequence[Sequence[float]]):
-        matrix = np.array(vectors, dtype="float32")
-        faiss.normalize_L2(matrix)
-        index = faiss.IndexFlatIP(matrix.shape[1])
-        index.add(matrix)
-        return index, matrix
+    def _pack_batches(texts: Sequence[str], indices: Sequence[int]) -> List[List[int]]:
+        batches: List[List[int]] = []
+        current: List[int] = []
+        tokens = 0
+        for idx in indices:
+            estimate = len(texts[idx]) // 4 + 1
+            if current and (len(current) >= EMBED_MAX_INPUTS or tokens + estimate > EMBED_MAX_TOKENS):
+                batches.append(current)
+                current, tokens = [], 0
+            current.append(idx)
+            tokens += estimate
+        if current:
+            batches.append(current)
+        return batches
+
+    @staticmethod
+    def _search(matrix: np.ndarray, query: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Inner-product top-k over L2-normalized rows.
+
+        A request only yields tens of chunks, where one BLAS matvec beats building
+        a FAISS index; FAISS is kept for unusually large candidate sets. NumPy has
+        no BLAS kernel for float16, so the small path stays in float32.
+        """
+        if len(matrix) >= FAISS_MIN_CHUNKS:
+            # fp16 storage halves the bytes scanned per query with no measurable ranking change
+            index = faiss.IndexScalarQuantizer(
+                matrix.shape[1], faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT
+            )
+            index.add(matrix)
+            scores, indices = index.search(query, k)
+            return scores[0], indices[0]
+        sims = matrix @ query[0]
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top], kind="stable")]
+        return sims[top], top
 
     async def _summarize(self, question: str, chunks: Sequence[DocumentChunk]) -> str:
         if not self.openai:
@@ -327,12 +578,12 @@ class RAGPipeline:
         if not text:
             return text
         # merge spaced-out single letters without touching normal words (e.g., "B G S U" -> "BGSU")
-        text = re.sub(r"\b([A-Za-z])\s+([A-Za-z])\b", r"\1\2", text)
+        text = _SPACED_LETTERS.sub(r"\1\2", text)
         # remove spaces before apostrophes
-        text = re.sub(r"\s+'", "'", text)
+        text = _SPACE_BEFORE_APOSTROPHE.sub("'", text)
         # collapse multiple spaces and limit blank lines
-        text = re.sub(r"[ \t]+", " ", text)
-        text = re.sub(r"\n{3,}", "\n\n", text)
+        text = _MULTI_SPACE.sub(" ", text)
+        text = _MULTI_NEWLINE.sub("\n\n", text)
         return text.strip()
 
     @staticmethod
@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
 """Build graph metrics from cleaned node/link data.
 
-Expects data/processed/clean_nodes.json and clean_edges.json (generated by
+Expects data/processed/clean_nodes.jsonl and clean_edges.jsonl (generated by
 scripts/clean_content.py). Loads those files, creates a directed graph, and
 computes metrics such as PageRank, betweenness, degree counts, hop distances,
-and depth from the homepage.
+and depth from the homepage (when "graph_metrics" is enabled in the config).
 
 Usage (run from repo root with venv activated):
 
@@ -15,15 +15,20 @@ Configuration lives in config/pipeline.json (or override with PIPELINE_CONFIG).
 
 from __future__ import annotations
 
-import json
 import logging
+import math
 import os
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List
-from urllib.parse import urlparse
+from typing import Dict, Iterable, Iterator, List, Tuple
+from urllib.parse import urlsplit
 
-import networkx as nx
+import orjson
+
+try:
+    import igraph as ig
+except ImportError:  # pragma: no cover - optional dep
+    ig = None  # type: ignore
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_CONFIG_PATH = REPO_ROOT / "config" / "pipeline.json"
@@ -33,6 +38,8 @@ DEFAULT_CONFIG_PATH = REPO_ROOT / "config" / "pipeline.json"
 class GraphSettings:
     processed_output: Path = REPO_ROOT / "data/processed"
     root_url: str = "https://www.bgsu.edu"
+    # betweenness is O(V*E); full-crawl metrics are an explicit opt-in
+    compute_metrics: bool = False
 
     @classmethod
     def from_dict(cls, data: Dict[str, object]) -> "GraphSettings":
@@ -46,15 +53,16 @@ class GraphSettings:
         return cls(
             processed_output=processed_output,
             root_url=get_value("root_url", default.root_url),
+            compute_metrics=bool(get_value("graph_metrics", default.compute_metrics)),
         )
 
     @property
     def clean_nodes_path(self) -> Path:
-        return self.processed_output / "clean_nodes.json"
+        return self.processed_output / "clean_nodes.jsonl"
 
     @property
     def clean_edges_path(self) -> Path:
-        return self.processed_output / "clean_edges.json"
+        return self.processed_output / "clean_edges.jsonl"
 
     @property
     def nodes_output_path(self) -> Path:
@@ -70,7 +78,8 @@ class GraphBuilder:
         self.settings = settings
         self.nodes: Dict[str, Dict] = {}
         self.edges: List[Dict] = []
-        self.graph = nx.DiGraph()
+        self.urls: List[str] = []
+        self.edge_pairs: List[Tuple[int, int]] = []
 
     def build(self) -> None:
         if not self._load_clean_data():
@@ -89,21 +98,19 @@ class GraphBuilder:
             logging.error("Run scripts/clean_content.py first.")
             return False
         logging.info("Loading cleaned nodes from %s", self.settings.clean_nodes_path)
-        with self.settings.clean_nodes_path.open("r", encoding="utf-8") as f:
-            nodes_list = json.load(f)
-        logging.info("Loading cleaned edges from %s", self.settings.clean_edges_path)
-        with self.settings.clean_edges_path.open("r", encoding="utf-8") as f:
-            self.edges = json.load(f)
-
-        for node in nodes_list:
+        for node in _read_jsonl(self.settings.clean_nodes_path):
             self.nodes[node["url"].rstrip("/")] = node
+        logging.info("Loading cleaned edges from %s", self.settings.clean_edges_path)
+        self.edges = list(_read_jsonl(self.settings.clean_edges_path))
         logging.info("Loaded %s nodes and %s edges from cleaned data", len(self.nodes), len(self.edges))
         return True
 
     def _build_graph(self) -> None:
+        # node payloads stay in self.nodes; the graph itself is only integer
+        # (source, target) index pairs, which is all the metric code needs
         logging.info("Building graph with %s nodes", len(self.nodes))
-        for url, data in self.nodes.items():
-            self.graph.add_node(url, **data)
+        index: Dict[str, int] = {url: idx for idx, url in enumerate(self.nodes)}
+        pairs: Dict[Tuple[int, int], None] = {}
         logging.info("Adding %s edges to graph", len(self.edges))
         for edge in self.edges:
             source = edge.get("source", "").rstrip("/")
@@ -120,22 +127,57 @@ class GraphBuilder:
                     "word_count": 0,
                     "clean_text": "",
                     "snippet": "",
-                    "domain": urlparse(target).netloc,
+                    "domain": urlsplit(target).netloc,
                     "is_root": False,
                 }
-                self.graph.add_node(target, **self.nodes[target])
-            self.graph.add_edge(source, target, **{k: v for k, v in edge.items() if k not in {"source", "target"}})
+            source_idx = index.setdefault(source, len(index))
+            target_idx = index.setdefault(target, len(index))
+            # repeated links between the same pages count once, as in a simple digraph
+            pairs[(source_idx, target_idx)] = None
+        self.urls = list(index)
+        self.edge_pairs = list(pairs)
 
     def _compute_metrics(self) -> None:
-        logging.info("Metric computation disabled (skipping slow analytics)")
-        # Intentionally left blank – we no longer compute PageRank/betweenness/etc.
+        if not self.settings.compute_metrics:
+            logging.info("Metric computation disabled (set graph_metrics to true in the pipeline config)")
+            return
+        if ig is None:
+            logging.error("graph_metrics is enabled but python-igraph is not installed; skipping metrics")
+            return
+        # igraph runs PageRank/betweenness/BFS in C straight off the index pairs
+        urls = self.urls
+        index = {url: idx for idx, url in enumerate(urls)}
+        g = ig.Graph(n=len(urls), edges=self.edge_pairs, directed=True)
+        logging.info("Computing metrics for %s nodes / %s edges with igraph", g.vcount(), g.ecount())
+        pagerank = g.pagerank(damping=0.85, directed=True)
+        betweenness = g.betweenness(directed=True)
+        in_degree = g.indegree()
+        out_degree = g.outdegree()
+        root = self.settings.root_url.rstrip("/")
+        if root in index:
+            depths = g.distances(source=index[root], mode="out")[0]
+        else:
+            logging.warning("Root URL %s not in graph; depth_from_root will be empty", root)
+            depths = [math.inf] * len(urls)
+
+        for url, idx in index.items():
+            node = self.nodes.get(url)
+            if node is None:
+                continue
+            depth = depths[idx]
+            node["metrics"] = {
+                "pagerank": pagerank[idx],
+                "betweenness": betweenness[idx],
+                "in_degree": in_degree[idx],
+                "out_degree": out_degree[idx],
+                "depth_from_root": int(depth) if math.isfinite(depth) else None,
+            }
+        logging.info("Computed metrics for %s nodes", len(urls))
 
     def _write_outputs(self) -> None:
         self.settings.processed_output.mkdir(parents=True, exist_ok=True)
-        with self.settings.nodes_output_path.open("w", encoding="utf-8") as f:
-            json.dump(list(self.nodes.values()), f, indent=2)
-        with self.settings.edges_output_path.open("w", encoding="utf-8") as f:
-            json.dump(self.edges, f, indent=2)
+        _write_json_array(self.settings.nodes_output_path, self.nodes.values())
+        _write_json_array(self.settings.edges_output_path, self.edges)
         logging.info(
             "Wrote enriched graph to %s and %s",
             self.settings.nodes_output_path,
@@ -143,6 +185,30 @@ class GraphBuilder:
         )
 
 
+def _read_jsonl(path: Path) -> Iterator[Dict]:
+    with path.open("rb") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield orjson.loads(line)
+            except orjson.JSONDecodeError:
+                # the cleaner may have been killed mid-line; it redoes that record on resume
+                logging.warning("Skipping malformed line %s in %s", line_no, path)
+
+
+def _write_json_array(path: Path, records: Iterable[Dict]) -> None:
+    """Write a JSON array one record per line without materializing the whole document."""
+    with path.open("wb") as f:
+        f.write(b"[")
+        for idx, record in enumerate(records):
+            if idx:
+                f.write(b",")
+            f.write(b"\n")
+            f.write(orjson.dumps(record))
+        f.write(b"\n]\n")
+
+
 def _resolve_path(path_value) -> Path:
     path = path_value if isinstance(path_value, Path) else Path(path_value)
     if not path.is_absolute():
@@ -154,11 +220,10 @@ def load_settings(config_path: Path | None = None) -> GraphSettings:
     path = config_path or DEFAULT_CONFIG_PATH
     if path.exists():
         try:
-            with path.open("r", encoding="utf-8") as f:
-                data = json.load(f)
+            data = orjson.loads(path.read_bytes())
             logging.info("Loaded pipeline config from %s", path)
             return GraphSettings.from_dict(data)
-        except json.JSONDecodeError as exc:
+        except orjson.JSONDecodeError as exc:
             logging.error("Failed to parse config %s: %s", path, exc)
     else:
         logging.warning("Config file %s not found. Using defaults.", path)
@@ -3,8 +3,9 @@
 
 Reads data/raw/metadata.tsv (produced by the crawler), parses HTML plus
 non-HTML assets (PDF, DOCX, spreadsheets, etc.), and emits
-data/processed/clean_nodes.json + clean_edges.json. These files are later
-consumed by scripts/build_graph.py to compute graph metrics.
+data/processed/clean_nodes.jsonl + clean_edges.jsonl. These files are later
+consumed by scripts/build_graph.py to compute graph metrics. Records are
+appended as they are cleaned, so an interrupted run picks up where it left off.
 
 Usage (run from repo root with venv activated):
 
@@ -15,15 +16,23 @@ Configuration lives in config/pipeline.json (or override with PIPELINE_CONFIG).
 
 from __future__ import annotations
 
-import json
+import csv
 import logging
 import os
+import re
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from contextlib import nullcontext
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Tuple
-from urllib.parse import urljoin, urlparse
+from typing import BinaryIO, Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urljoin, urlsplit, urlunsplit
 
-from bs4 import BeautifulSoup
+import orjson
+import pandas as pd
+from lxml import etree
+from selectolax.lexbor import LexborHTMLParser
 
 try:
     from docx import Document
@@ -39,15 +48,33 @@ except ImportError:  # pragma: no cover
 REPO_ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_CONFIG_PATH = REPO_ROOT / "config" / "pipeline.json"
 
+# (title, word_count, [(link_url, anchor_text)], clean_text)
+HtmlResult = Tuple[str, int, List[Tuple[str, str]], str]
+
+_WS_RE = re.compile(r"\s+")
+# "scheme://" at the start of an href (RFC 3986 scheme characters)
+_ABSOLUTE_HREF_RE = re.compile(r"[A-Za-z][A-Za-z0-9+.-]*://")
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+METADATA_CHUNK_ROWS = 10_000
+
+_HTML_SUFFIXES = frozenset({".html", ".htm", ".php", ".asp", ".aspx", ".jsp"})
+_IMAGE_SUFFIXES = frozenset({".jpg", ".jpeg", ".png", ".gif", ".bmp", ".svg", ".tif", ".tiff"})
+
+# PDFs longer than this get their pages extracted across a small process pool
+PDF_PARALLEL_MIN_PAGES = 20
+PDF_MAX_WORKERS = 4
+
 
 @dataclass
 class CleaningSettings:
     raw_output: Path = REPO_ROOT / "data/raw"
     processed_output: Path = REPO_ROOT / "data/processed"
-    allowed_domains: List[str] = field(default_factory=lambda: ["www.bgsu.edu", "bgsu.edu"])
+    allowed_domains: FrozenSet[str] = frozenset({"www.bgsu.edu", "bgsu.edu"})
     root_url: str = "https://www.bgsu.edu"
     snippet_chars: int = 600
     checkpoint_interval: int = 50
+    workers: int = field(default_factory=lambda: os.cpu_count() or 1)
 
     @classmethod
     def from_dict(cls, data: Dict[str, object]) -> "CleaningSettings":
@@ -62,10 +89,11 @@ class CleaningSettings:
         return cls(
             raw_output=raw_output,
             processed_output=processed_output,
-            allowed_domains=list(get_value("allowed_domains", list(default.allowed_domains))),
+            allowed_domains=frozenset(get_value("allowed_domains", default.allowed_domains)),
             root_url=get_value("root_url", default.root_url),
             snippet_chars=int(get_value("graph_snippet_chars", default.snippet_chars)),
             checkpoint_interval=int(get_value("cleaning_checkpoint_interval", default.checkpoint_interval)),
+            workers=int(get_value("cleaning_workers", default.workers)),
         )
 
     @property
@@ -74,194 +102,202 @@ class CleaningSettings:
 
     @property
     def clean_nodes_path(self) -> Path:
-        return self.processed_output / "clean_nodes.json"
+        return self.processed_output / "clean_nodes.jsonl"
 
     @property
     def clean_edges_path(self) -> Path:
-        return self.processed_output / "clean_edges.json"
+        return self.processed_output / "clean_edges.jsonl"
 
 
 class ContentCleaner:
     def __init__(self, settings: CleaningSettings) -> None:
         self.settings = settings
-        self.nodes: Dict[str, Dict] = {}
-        self.edges: List[Dict] = []
+        self._root_url = settings.root_url.rstrip("/")
 
     def run(self) -> None:
-        records = self._read_metadata()
-        if not records:
-            logging.error("No metadata records found at %s", self.settings.metadata_path)
+        metadata_path = self.settings.metadata_path
+        if not metadata_path.exists():
+            logging.error("Metadata file missing: %s", metadata_path)
             return
 
-        if self.settings.clean_nodes_path.exists():
-            try:
-                with self.settings.clean_nodes_path.open("r", encoding="utf-8") as f:
-                    existing_nodes = {node["url"].rstrip("/"): node for node in json.load(f)}
-                self.nodes.update(existing_nodes)
-                logging.info("Loaded %s existing cleaned nodes", len(self.nodes))
-            except Exception as exc:
-                logging.warning("Failed to load existing cleaned nodes: %s", exc)
-
-        if self.settings.clean_edges_path.exists():
-            try:
-                with self.settings.clean_edges_path.open("r", encoding="utf-8") as f:
-                    self.edges = json.load(f)
-                logging.info("Loaded %s existing cleaned edges", len(self.edges))
-            except Exception as exc:
-                logging.warning("Failed to load existing cleaned edges: %s", exc)
-
-        total = len(records)
-        logging.info("Cleaning %s records (serial)", total)
-        for idx, record in enumerate(records, start=1):
-            url, node, edges = self._process_record(record)
-            self.nodes[url] = node
-            self.edges.extend(edges)
-            if idx % 50 == 0:
-                logging.info("Processing [%s/%s]: %s", idx, total, url)
-
-        self._write_outputs()
-
-    def _write_outputs(self, partial: bool = False) -> None:
-        output_dir = self.settings.processed_output
-        output_dir.mkdir(parents=True, exist_ok=True)
-        with self.settings.clean_nodes_path.open("w", encoding="utf-8") as f:
-            json.dump(list(self.nodes.values()), f, indent=2)
-        with self.settings.clean_edges_path.open("w", encoding="utf-8") as f:
-            json.dump(self.edges, f, indent=2)
-        if partial:
-            logging.info(
-                "Checkpoint: %s nodes / %s edges written",
-                len(self.nodes),
-                len(self.edges),
-            )
-        else:
-            logging.info(
-                "Wrote %s nodes and %s edges to %s / %s",
-                len(self.nodes),
-                len(self.edges),
-                self.settings.clean_nodes_path,
-                self.settings.clean_edges_path,
-            )
+        # nodes/edges are appended to JSONL as they are produced, so a rerun
+        # resumes after the last cleaned URL instead of starting over
+        seen = self._load_cleaned_urls()
+        pending = self._pending_records(seen)
+        workers = max(1, self.settings.workers)
+        checkpoint_interval = max(1, self.settings.checkpoint_interval)
+        node_count = 0
+        edge_count = 0
+        self.settings.processed_output.mkdir(parents=True, exist_ok=True)
+        logging.info("Cleaning records from %s across %s processes", metadata_path, workers)
+        # a single worker cleans in this process, which leaves PDF pages free to fan out instead
+        record_pool = (
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self.settings,))
+            if workers > 1
+            else nullcontext()
+        )
+        with _open_jsonl(self.settings.clean_nodes_path) as nodes_file, _open_jsonl(
+            self.settings.clean_edges_path
+        ) as edges_file, record_pool as executor:
+            if executor is None:
+                results = map(self._process_record, pending)
+            else:
+                results = _clean_in_pool(executor, pending, workers * 256)
+            for url, node, edges in results:
+                # resume is keyed on nodes, so a page's edges are flushed before its node row
+                # can reach disk; a kill in between re-cleans the page rather than losing edges
+                for edge in edges:
+                    edges_file.write(orjson.dumps(edge) + b"\n")
+                if edges:
+                    edges_file.flush()
+                nodes_file.write(orjson.dumps(node) + b"\n")
+                node_count += 1
+                edge_count += len(edges)
+                if node_count % checkpoint_interval == 0:
+                    edges_file.flush()
+                    nodes_file.flush()
+                    logging.info("Checkpoint: %s nodes / %s edges written", node_count, edge_count)
+                if node_count % 50 == 0:
+                    logging.info("Processing [%s]: %s", node_count, url)
+
+        if not node_count:
+            logging.info("No new metadata records to clean in %s", metadata_path)
+            return
+        logging.info(
+            "Wrote %s nodes and %s edges to %s / %s",
+            node_count,
+            edge_count,
+            self.settings.clean_nodes_path,
+            self.settings.clean_edges_path,
+        )
+
+    def _pending_records(self, seen: Set[str]) -> Iterator[Dict[str, str]]:
+        # a re-crawl appends to metadata.tsv, so the last row for a URL is the current
+        # one; a first pass records where that is, keeping only a url -> row index map
+        last_row: Dict[str, int] = {}
+        for row, record in enumerate(self._iter_metadata()):
+            last_row[record["url"].rstrip("/")] = row
+        for row, record in enumerate(self._iter_metadata()):
+            url = record["url"].rstrip("/")
+            if url in seen or last_row[url] != row:
+                continue
+            yield record
+
+    def _load_cleaned_urls(self) -> Set[str]:
+        path = self.settings.clean_nodes_path
+        seen: Set[str] = set()
+        if not path.exists():
+            return seen
+        with path.open("rb") as f:
+            for line in f:
+                try:
+                    seen.add(orjson.loads(line)["url"].rstrip("/"))
+                except (orjson.JSONDecodeError, KeyError, TypeError):
+                    # a run killed mid-write can leave a truncated last line; that page is redone
+                    continue
+        logging.info("Found %s already cleaned nodes in %s", len(seen), path)
+        return seen
 
     def _process_record(self, record: Dict[str, str]):
         url = record["url"].rstrip("/")
         absolute_path = _resolve_path(record["path"])
-        parsed = urlparse(url)
+        suffix = _suffix(record["path"])
+        parsed = urlsplit(url)
         node = {
             "url": url,
             "path": record["path"],
             "content_type": record["content_type"],
-            "doc_type": self._infer_doc_type(record["path"], record["content_type"]),
+            "doc_type": self._infer_doc_type(suffix, record["content_type"]),
             "title": None,
             "word_count": 0,
             "clean_text": "",
             "snippet": "",
             "domain": parsed.netloc,
-            "is_root": url.rstrip("/") == self.settings.root_url.rstrip("/"),
+            "is_root": url == self._root_url,
         }
         edges: List[Dict[str, str]] = []
 
-        if self._is_html(record["content_type"], record["path"]):
-            title, word_count, links, clean_text = self._process_html(absolute_path, url)
+        if self._is_html(record["content_type"], suffix):
+            title, word_count, links, clean_text = _process_html(absolute_path, url)
             node["title"] = title
             node["word_count"] = word_count
             node["clean_text"] = clean_text
             node["snippet"] = clean_text[: self.settings.snippet_chars]
+            # one edge per (source, target): the first anchor's text is kept
+            targets: Set[str] = set()
             for link_url, anchor_text in links:
-                if not self._is_allowed_domain(link_url):
+                target = link_url.rstrip("/")
+                if target in targets or not self._is_allowed_domain(link_url):
                     continue
-                edges.append({"source": url, "target": link_url.rstrip("/"), "anchor_text": anchor_text})
+                targets.add(target)
+                edges.append({"source": url, "target": target, "anchor_text": anchor_text})
         else:
-            extracted_text = self._extract_text_from_file(absolute_path)
+            # collapse PDF/DOCX layout whitespace once, the same way HTML text is, so the
+            # word count is a character count rather than a split of the whole document
+            extracted_text = _WS_RE.sub(" ", self._extract_text_from_file(absolute_path, suffix)).strip()
             node["title"] = Path(record["path"]).name
             node["clean_text"] = extracted_text
             node["snippet"] = extracted_text[: self.settings.snippet_chars]
-            node["word_count"] = len(extracted_text.split())
+            node["word_count"] = extracted_text.count(" ") + 1 if extracted_text else 0
 
         return url, node, edges
 
-    def _read_metadata(self) -> List[Dict[str, str]]:
-        metadata_path = self.settings.metadata_path
-        if not metadata_path.exists():
-            logging.error("Metadata file missing: %s", metadata_path)
-            return []
-        records: List[Dict[str, str]] = []
-        with metadata_path.open("r", encoding="utf-8") as meta:
-            header = meta.readline()
-            for line in meta:
-                parts = line.strip().split("\t")
-                if len(parts) != 3:
-                    continue
-                url, path_str, content_type = parts
-                records.append({"url": url, "path": path_str, "content_type": content_type})
-        return records
+    def _iter_metadata(self) -> Iterator[Dict[str, str]]:
+        # pandas' C tokenizer is much faster than a Python split loop on large crawls;
+        # reading in chunks keeps memory flat however long the crawl log gets
+        chunks = pd.read_csv(
+            self.settings.metadata_path,
+            sep="\t",
+            header=0,
+            names=["url", "path", "content_type"],
+            dtype=str,
+            keep_default_na=False,
+            quoting=csv.QUOTE_NONE,
+            on_bad_lines="skip",
+            encoding="utf-8",
+            chunksize=METADATA_CHUNK_ROWS,
+        )
+        with chunks:
+            for frame in chunks:
+                # rows with a missing url or content type were never usable records
+                frame = frame[(frame["url"] != "") & (frame["content_type"] != "")]
+                yield from frame.to_dict("records")
 
     @staticmethod
-    def _infer_doc_type(path: str, content_type: str) -> str:
-        extension = Path(path).suffix.lower()
-        if extension:
-            return extension.lstrip(".")
+    def _infer_doc_type(suffix: str, content_type: str) -> str:
+        if suffix:
+            return suffix.lstrip(".")
         if content_type:
             return content_type.split("/")[-1]
         return "unknown"
 
     @staticmethod
-    def _is_html(content_type: str, path: str) -> bool:
+    def _is_html(content_type: str, suffix: str) -> bool:
         if "text/html" in content_type:
             return True
-        return Path(path).suffix.lower() in {".html", ".htm", ".php", ".asp", ".aspx", ".jsp"}
+        return suffix in _HTML_SUFFIXES
 
     def _is_allowed_domain(self, url: str) -> bool:
-        parsed = urlparse(url)
-        return parsed.netloc in self.settings.allowed_domains
+        return _netloc(url) in self.settings.allowed_domains
 
-    def _process_html(self, path: Path, base_url: str) -> Tuple[str, int, List[Tuple[str, str]], str]:
-        try:
-            html = path.read_text(encoding="utf-8", errors="ignore")
-        except FileNotFoundError:
-            logging.warning("HTML file missing during cleaning: %s", path)
-            return "", 0, [], ""
-
-        soup = BeautifulSoup(html, "html.parser")
-        for tag in soup(["script", "style", "noscript", "svg"]):
-            tag.decompose()
-
-        title = (soup.title.string or "").strip() if soup.title and soup.title.string else ""
-        text = soup.get_text(separator=" ", strip=True)
-        clean_text = " ".join(text.split())
-        word_count = len(clean_text.split())
-
-        links: List[Tuple[str, str]] = []
-        for anchor in soup.find_all("a", href=True):
-            href = anchor["href"].strip()
-            absolute = urljoin(base_url, href).split("#", 1)[0].rstrip("/")
-            if not absolute:
-                continue
-            anchor_text = anchor.get_text(strip=True)[:200]
-            links.append((absolute, anchor_text))
-        return title, word_count, links, clean_text
-
-    def _extract_text_from_file(self, path: Path) -> str:
+    def _extract_text_from_file(self, path: Path, suffix: str) -> str:
         if not path.exists():
             logging.warning("File missing during cleaning: %s", path)
             return ""
-        suffix = path.suffix.lower()
-        if suffix in {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".svg", ".tif", ".tiff"}:
+        if suffix in _IMAGE_SUFFIXES:
             return ""
         try:
             if suffix == ".pdf":
                 if fitz is None:
                     logging.warning("PyMuPDF not installed; skipping PDF %s", path)
                     return ""
-                doc = fitz.open(path)
-                texts = []
-                for page in doc:
-                    txt = page.get_text("text").strip()
-                    if txt:
-                        texts.append(txt)
-                doc.close()
-                return " ".join(texts)
+                # page-level processes only when records are not already spread over a pool
+                return _extract_pdf_text(path, PDF_MAX_WORKERS if self.settings.workers <= 1 else 1)
             if suffix in {".docx"}:
+                try:
+                    return _extract_docx_text(path)
+                except (zipfile.BadZipFile, KeyError, etree.XMLSyntaxError) as exc:
+                    logging.debug("Raw DOCX read failed for %s (%s); trying python-docx", path, exc)
                 if Document is None:
                     logging.warning("python-docx not installed; skipping DOCX %s", path)
                     return ""
@@ -284,6 +320,156 @@ class ContentCleaner:
             return ""
 
 
+def _open_jsonl(path: Path) -> BinaryIO:
+    """Open a JSONL file for appending, terminating any line a killed run left unfinished."""
+    handle = path.open("a+b")
+    if handle.seek(0, os.SEEK_END):
+        handle.seek(-1, os.SEEK_END)
+        if handle.read(1) != b"\n":
+            handle.write(b"\n")
+    return handle
+
+
+_worker_cleaner: Optional[ContentCleaner] = None
+
+
+def _init_worker(settings: CleaningSettings) -> None:
+    global _worker_cleaner
+    _worker_cleaner = ContentCleaner(settings)
+
+
+def _clean_in_pool(executor: ProcessPoolExecutor, records: Iterator[Dict[str, str]], limit: int):
+    """Yield cleaned records as they finish, keeping at most `limit` submitted at once.
+
+    The in-flight set is topped up as each result drains, so one slow record (a long
+    PDF) never leaves the other workers idle, and the pending records are never all
+    held in memory.
+    """
+    in_flight: Set[Future] = set()
+    for record in records:
+        in_flight.add(executor.submit(_process_record_worker, record))
+        if len(in_flight) >= limit:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    while in_flight:
+        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+
+
+def _process_record_worker(record: Dict[str, str]):
+    """Clean one metadata record inside a pool worker (HTML, PDF or DOCX)."""
+    return _worker_cleaner._process_record(record)
+
+
+def _suffix(path: str) -> str:
+    """Same as Path(path).suffix.lower(), without building a Path for every record."""
+    name = path[path.rfind("/") + 1 :]
+    dot = name.rfind(".")
+    return name[dot:].lower() if 0 < dot < len(name) - 1 else ""
+
+
+@lru_cache(maxsize=131072)
+def _netloc(url: str) -> str:
+    # pages share their nav/footer links, so the same targets are checked over and over
+    return urlsplit(url).netloc
+
+
+@lru_cache(maxsize=200_000)
+def _join(base: str, href: str) -> str:
+    return urljoin(base, href).split("#", 1)[0].rstrip("/")
+
+
+def _pdf_pages_text(path: str, start: int, stop: int) -> List[str]:
+    """Extract the non-empty text blocks of pages [start, stop) from one PDF."""
+    texts: List[str] = []
+    with fitz.open(path) as doc:
+        for index in range(start, stop):
+            # block tuples are (x0, y0, x1, y1, text, block_no, block_type); type 0 is text
+            for block in doc.load_page(index).get_text("blocks"):
+                txt = block[4].strip()
+                if block[6] == 0 and txt:
+                    texts.append(txt)
+    return texts
+
+
+def _extract_pdf_text(path: Path, max_workers: int = 1) -> str:
+    with fitz.open(path) as doc:
+        page_count = doc.page_count
+    workers = min(max_workers, os.cpu_count() or 1)
+    if page_count <= PDF_PARALLEL_MIN_PAGES or workers < 2:
+        return " ".join(_pdf_pages_text(str(path), 0, page_count))
+
+    # each worker opens the file once and takes a contiguous run of pages
+    step = -(-page_count // workers)
+    starts = range(0, page_count, step)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunks = executor.map(
+            _pdf_pages_text,
+            [str(path)] * len(starts),
+            starts,
+            [min(start + step, page_count) for start in starts],
+        )
+        return " ".join(txt for chunk in chunks for txt in chunk)
+
+
+def _extract_docx_text(path: Path) -> str:
+    """Stream paragraph text out of word/document.xml without building python-docx objects.
+
+    Table cells are paragraphs too, so tables come out inline in reading order.
+    """
+    parts: List[str] = []
+    with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as f:
+        for _, para in etree.iterparse(f, tag=f"{_W_NS}p"):
+            txt = "".join(node.text or "" for node in para.iter(f"{_W_NS}t")).strip()
+            if txt:
+                parts.append(txt)
+            para.clear()
+    return " ".join(parts)
+
+
+def _process_html(path: Path, base_url: str) -> HtmlResult:
+    """Parse one saved HTML page."""
+    try:
+        html = path.read_text(encoding="utf-8", errors="ignore")
+    except FileNotFoundError:
+        logging.warning("HTML file missing during cleaning: %s", path)
+        return "", 0, [], ""
+
+    tree = LexborHTMLParser(html)
+    for node in tree.css("script, style, noscript, svg"):
+        node.decompose()
+
+    title_node = tree.css_first("title")
+    title = title_node.text(strip=True) if title_node else ""
+    text = tree.root.text(separator=" ", strip=True) if tree.root else ""
+    clean_text = _WS_RE.sub(" ", text).strip()
+    word_count = clean_text.count(" ") + 1 if clean_text else 0
+
+    parts = urlsplit(base_url)
+    origin = urlunsplit((parts.scheme, parts.netloc, "", "", ""))
+    links: List[Tuple[str, str]] = []
+    seen_hrefs: Set[str] = set()
+    for anchor in tree.css("a[href]"):
+        href = (anchor.attributes.get("href") or "").strip()
+        # nav/footer menus repeat the same link many times per page; the first anchor wins
+        if href in seen_hrefs:
+            continue
+        seen_hrefs.add(href)
+        # root-relative and absolute hrefs resolve the same from every page on the
+        # site, so key them on the origin to share cache entries across pages
+        if _ABSOLUTE_HREF_RE.match(href) or (href.startswith("/") and not href.startswith("//")):
+            absolute = _join(origin, href)
+        else:
+            absolute = _join(base_url, href)
+        if not absolute:
+            continue
+        anchor_text = anchor.text(strip=True)[:200]
+        links.append((absolute, anchor_text))
+    return title, word_count, links, clean_text
+
+
 def _resolve_path(path_value) -> Path:
     path = path_value if isinstance(path_value, Path) else Path(path_value)
     if not path.is_absolute():
@@ -295,11 +481,10 @@ def load_settings(config_path: Path | None = None) -> CleaningSettings:
     path = config_path or DEFAULT_CONFIG_PATH
     if path.exists():
         try:
-            with path.open("r", encoding="utf-8") as f:
-                data = json.load(f)
+            data = orjson.loads(path.read_bytes())
             logging.info("Loaded pipeline config from %s", path)
             return CleaningSettings.from_dict(data)
-        except json.JSONDecodeError as exc:
+        except orjson.JSONDecodeError as exc:
             logging.error("Failed to parse config %s: %s", path, exc)
     else:
         logging.warning("Config file %s not found. Using defaults.", path)
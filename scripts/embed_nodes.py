@@ -5,6 +5,12 @@ Build FAISS embeddings for nodes.json so we can serve RAG locally.
 Prerequisites (install inside the venv you use for the project):
 
     pip install sentence-transformers faiss-cpu
+    pip install ijson  # optional: stream nodes.json instead of loading it whole
+
+For faster CPU encoding, install the ONNX extra and pass --backend onnx
+(optionally with --model-file pointing at a quantized export):
+
+    pip install "sentence-transformers[onnx]"
 
 Usage (run from repo root, after clean_content/build_graph have produced data/processed/nodes.json):
 
@@ -18,16 +24,30 @@ Usage (run from repo root, after clean_content/build_graph have produced data/pr
 from __future__ import annotations
 
 import argparse
-import json
 import logging
+import math
 import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
 
 import faiss
 import numpy as np
+import orjson
 from sentence_transformers import SentenceTransformer
 
+try:
+    import ijson
+except ImportError:  # pragma: no cover - optional dependency
+    ijson = None
+
 REPO_ROOT = Path(__file__).resolve().parents[1]
+# nodes handed to model.encode per call; keeps payload text bounded while
+# still letting sentence-transformers length-sort within a decent window
+ENCODE_CHUNK_BATCHES = 32
+# IVF lists and SQ ranges are trained on at most this many leading vectors
+TRAIN_SAMPLE_SIZE = 50_000
 
 
 def parse_args() -> argparse.Namespace:
@@ -55,18 +75,49 @@ def parse_args() -> argparse.Namespace:
         default="sentence-transformers/paraphrase-MiniLM-L6-v2",
         help="SentenceTransformer model name (use a smaller/quantized model if you need more speed)",
     )
+    parser.add_argument(
+        "--index-type",
+        choices=["flat", "hnsw", "ivf"],
+        default="hnsw",
+        help="FAISS index: exact flat scan, HNSW graph (default), or IVF clusters",
+    )
+    parser.add_argument(
+        "--sq8",
+        action="store_true",
+        help="Store vectors as 8-bit scalar-quantized codes (4x smaller index, small recall cost)",
+    )
     parser.add_argument("--batch-size", type=int, default=64, help="Batch size for encoding")
     parser.add_argument("--device", default="mps", help="Device to use (cpu, cuda, mps)")
+    parser.add_argument(
+        "--backend",
+        choices=["torch", "onnx", "openvino"],
+        default="torch",
+        help="Inference backend; onnx/openvino need sentence-transformers>=3.2 with the matching extra",
+    )
+    parser.add_argument(
+        "--model-file",
+        default=None,
+        help="ONNX/OpenVINO file inside the model repo, e.g. onnx/model_qint8_avx512_vnni.onnx for int8 weights",
+    )
     return parser.parse_args()
 
 
-def load_nodes(path: Path) -> list[dict]:
+def iter_nodes(path: Path) -> Iterator[dict]:
+    """Yield nodes one at a time; streams with ijson when it is installed."""
     if not path.exists():
         raise FileNotFoundError(f"nodes.json not found at {path}. Run build_graph.py first.")
-    with path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
-    logging.info("Loaded %s nodes from %s", len(data), path)
-    return data
+    if ijson is None:
+        logging.info("ijson not installed; loading %s into memory", path)
+        yield from orjson.loads(path.read_bytes())
+        return
+    with path.open("rb") as f:
+        yield from ijson.items(f, "item", use_float=True)
+
+
+def iter_chunks(items: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    it = iter(items)
+    while chunk := list(islice(it, size)):
+        yield chunk
 
 
 def make_payload(node: dict) -> str:
@@ -78,51 +129,140 @@ def make_payload(node: dict) -> str:
     return f"{title}\n{doc_type} {depth_txt}\n{snippet}\n{node.get('clean_text','')}"
 
 
-def main() -> None:
-    args = parse_args()
-    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+def build_index(embeddings: np.ndarray, index_type: str, sq8: bool = False) -> faiss.Index:
+    """Inner-product index over normalized vectors (i.e. cosine similarity)."""
+    count, dim = embeddings.shape
+    metric = faiss.METRIC_INNER_PRODUCT
+    qtype = faiss.ScalarQuantizer.QT_8bit
+    if index_type == "hnsw":
+        # sub-linear search with no training step (beyond SQ ranges); efSearch is saved with the index
+        index = faiss.IndexHNSWSQ(dim, qtype, 32, metric) if sq8 else faiss.IndexHNSWFlat(dim, 32, metric)
+        index.hnsw.efConstruction = 200
+        index.hnsw.efSearch = 64
+    elif index_type == "ivf":
+        # FAISS wants ~39 training points per list, so small crawls get fewer lists
+        nlist = max(1, min(int(4 * math.sqrt(count)), count // 39))
+        quantizer = faiss.IndexFlatIP(dim)
+        if sq8:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, qtype, metric)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, metric)
+        index.nprobe = min(nlist, 16)
+    else:
+        index = faiss.IndexScalarQuantizer(dim, qtype, metric) if sq8 else faiss.IndexFlatIP(dim)
+    logging.info("Building %s%s index from %s vectors", index_type, " (sq8)" if sq8 else "", count)
+    if not index.is_trained:
+        index.train(embeddings)
+    index.add(embeddings)
+    return index
 
-    nodes = load_nodes(args.nodes)
-    texts = [make_payload(node) for node in nodes]
 
-    logging.info("Loading embedding model: %s (device=%s)", args.model, args.device)
-    model = SentenceTransformer(args.model, device=args.device)
+class IndexSink:
+    """Adds encoded chunks to the FAISS index and appends their rows to the mapping file."""
 
-    logging.info("Encoding %s nodes (batch=%s) on %s", len(texts), args.batch_size, args.device)
-    embeddings = model.encode(
-        texts,
-        batch_size=args.batch_size,
-        show_progress_bar=True,
-        convert_to_numpy=True,
-        normalize_embeddings=True,
-    ).astype("float32")
+    def __init__(self, index_type: str, sq8: bool, mapping_file: BinaryIO) -> None:
+        self.index_type = index_type
+        self.sq8 = sq8
+        # flat/HNSW accept vectors as they come; IVF and SQ8 need a training sample first
+        self.needs_training = sq8 or index_type == "ivf"
+        self.index: faiss.Index | None = None
+        self.pending: list[np.ndarray] = []
+        self.pending_rows = 0
+        self.rows = 0
+        self.mapping_file = mapping_file
+        mapping_file.write(b"[")
 
-    dim = embeddings.shape[1]
-    logging.info("Embedding dimension: %s", dim)
-    index = faiss.IndexFlatIP(dim)  # cosine similarity (since vectors are normalized)
-    index.add(embeddings)
+    def add(self, nodes: list[dict], embeddings: np.ndarray) -> None:
+        if self.index is not None:
+            self.index.add(embeddings)
+        elif not self.needs_training:
+            logging.info("Embedding dimension: %s", embeddings.shape[1])
+            self.index = build_index(embeddings, self.index_type, self.sq8)
+        else:
+            self.pending.append(embeddings)
+            self.pending_rows += len(embeddings)
+            if self.pending_rows >= TRAIN_SAMPLE_SIZE:
+                logging.info("Embedding dimension: %s", embeddings.shape[1])
+                self.index = build_index(np.vstack(self.pending), self.index_type, self.sq8)
+                self.pending.clear()
 
-    args.index.parent.mkdir(parents=True, exist_ok=True)
-    faiss.write_index(index, str(args.index))
-    logging.info("Wrote FAISS index to %s", args.index)
-
-    mapping = []
-    for row_id, node in enumerate(nodes):
-        mapping.append(
-            {
-                "row_id": row_id,
+        for node in nodes:
+            entry = {
+                "row_id": self.rows,
                 "url": node["url"],
                 "title": node.get("title"),
                 "snippet": node.get("snippet"),
                 "metrics": node.get("metrics", {}),
             }
-        )
+            self.mapping_file.write(b",\n" if self.rows else b"\n")
+            self.mapping_file.write(orjson.dumps(entry))
+            self.rows += 1
+        logging.info("Indexed %s nodes", self.rows)
+
+    def finish(self) -> faiss.Index:
+        self.mapping_file.write(b"\n]\n")
+        if self.index is None:
+            if not self.pending:
+                raise ValueError("No nodes to embed")
+            logging.info("Embedding dimension: %s", self.pending[0].shape[1])
+            self.index = build_index(np.vstack(self.pending), self.index_type, self.sq8)
+            self.pending.clear()
+        return self.index
+
 
+def main() -> None:
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    # nodes are read lazily, so check for the file before paying for the model load
+    if not args.nodes.exists():
+        raise FileNotFoundError(f"nodes.json not found at {args.nodes}. Run build_graph.py first.")
+
+    logging.info("Loading embedding model: %s (device=%s, backend=%s)", args.model, args.device, args.backend)
+    model_options = {}
+    if args.backend != "torch":
+        # only passed when needed so older sentence-transformers releases keep working
+        model_options["backend"] = args.backend
+        if args.model_file:
+            model_options["model_kwargs"] = {"file_name": args.model_file}
+    model = SentenceTransformer(args.model, device=args.device, **model_options)
+
+    logging.info("Encoding nodes from %s (batch=%s) on %s", args.nodes, args.batch_size, args.device)
     args.mapping.parent.mkdir(parents=True, exist_ok=True)
-    with args.mapping.open("w", encoding="utf-8") as f:
-        json.dump(mapping, f, indent=2)
-    logging.info("Wrote node mapping (%s rows) to %s", len(mapping), args.mapping)
+    args.index.parent.mkdir(parents=True, exist_ok=True)
+    # both outputs are built next to their targets and swapped in only once the run
+    # has finished, so an interrupted run keeps the previous index/mapping pair
+    mapping_tmp = args.mapping.with_name(args.mapping.name + ".tmp")
+    index_tmp = args.index.with_name(args.index.name + ".tmp")
+    try:
+        with mapping_tmp.open("wb") as mapping_file, ThreadPoolExecutor(max_workers=1) as writer:
+            sink = IndexSink(args.index_type, args.sq8, mapping_file)
+            pending = None
+            for chunk in iter_chunks(iter_nodes(args.nodes), args.batch_size * ENCODE_CHUNK_BATCHES):
+                embeddings = model.encode(
+                    [make_payload(node) for node in chunk],
+                    batch_size=args.batch_size,
+                    show_progress_bar=False,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                ).astype("float32")
+                # index/write chunk N on the writer thread while chunk N+1 is encoded;
+                # waiting here keeps at most two chunks in flight and surfaces errors
+                if pending is not None:
+                    pending.result()
+                pending = writer.submit(sink.add, chunk, embeddings)
+            if pending is not None:
+                pending.result()
+            index = sink.finish()
+        faiss.write_index(index, str(index_tmp))
+    except BaseException:
+        mapping_tmp.unlink(missing_ok=True)
+        index_tmp.unlink(missing_ok=True)
+        raise
 
+    os.replace(index_tmp, args.index)
+    logging.info("Wrote FAISS index (%s vectors) to %s", index.ntotal, args.index)
+    os.replace(mapping_tmp, args.mapping)
+    logging.info("Wrote node mapping (%s rows) to %s", sink.rows, args.mapping)
 
 if __name__ == "__main__":
     main()